@@ -2,21 +2,32 @@ import os
 import shutil
 import re
 import argparse
+import hashlib
+import json
 import sys
 import time
 import http.server
 import socketserver
 import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from email.utils import formatdate
+from xml.sax.saxutils import escape
 
 # Try to import advanced modules
 try:
     import yaml
     HAS_YAML = True
+    # Prefer the libyaml-backed loader when PyYAML was built with it
+    YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    # Shared by every page to type plain scalars without building a loader
+    YAML_RESOLVER = yaml.resolver.Resolver()
+    YAML_CONSTRUCTOR = yaml.constructor.SafeConstructor()
 except ImportError:
     HAS_YAML = False
+    YAML_LOADER = None
 
 try:
     from watchdog.observers import Observer
@@ -25,9 +36,310 @@ try:
 except ImportError:
     HAS_WATCHDOG = False
 
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# Large enough that a typical page or sitemap is flushed with a single write
+WRITE_BUFFER_SIZE = 1 << 17
+
+# Bump to force a clean rebuild when the manifest format changes
+MANIFEST_VERSION = 1
+
+# Starting the process pool costs tens of milliseconds while a page renders
+# serially in well under 0.1 ms, so the pool only pays off on large sites
+PARALLEL_MIN_PAGES = 1000
+
+# Linux ioctl for copy-on-write clones (btrfs, XFS)
+FICLONE = 0x40049409
+
+# --- Template Patterns ---
+
+# Matches both <template include="..."> and <template variable="..." default="...">
+# so a document is walked once for every directive it contains. The optional
+# `...</template>` tail may not run into another <template tag, otherwise a
+# bare <template variable="x"> would swallow the directives after it.
+_TEMPLATE_RE = re.compile(
+    r'<template\s+(?:include=["\'](?P<inc>.*?)["\']'
+    r'|variable=["\'](?P<var>.*?)["\'](?:\s+default=["\'](?P<def>.*?)["\'])?)'
+    r'\s*(?:/>|>(?:(?:(?!<template\b).)*?</template>)?)',
+    re.DOTALL)
+
+# --- File Helpers ---
+
+def _copy_data(src, dst):
+    """
+    Copies file data in the kernel: reflink first, then sendfile.
+    Raises OSError when neither is supported for these files.
+    """
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            if HAS_FCNTL and sys.platform.startswith('linux'):
+                try:
+                    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+                    return
+                except OSError:
+                    pass # Not a CoW filesystem, fall through to sendfile
+
+            size = os.fstat(src_fd).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+def _fast_copy(src, dst):
+    """
+    Drop-in replacement for shutil.copy2 used when copying assets.
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    try:
+        if not hasattr(os, 'sendfile'):
+            raise OSError("sendfile not available")
+        _copy_data(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+    return dst
+
+def _hash_source(text):
+    # Hashes the decoded text build_page renders, so both sides agree
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _is_copy_stale(src, dst):
+    try:
+        dst_stat = dst.stat()
+    except FileNotFoundError:
+        return True
+    src_stat = src.stat()
+    # copystat preserves mtime, so an unchanged source matches exactly
+    return (src_stat.st_size != dst_stat.st_size
+            or src_stat.st_mtime_ns != dst_stat.st_mtime_ns)
+
+def _remove_path(path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+def _sync_tree(src, dst):
+    """
+    Mirrors src into dst, copying only new or changed files and removing
+    anything in dst that no longer exists in src.
+    """
+    if dst.exists() and not dst.is_dir():
+        dst.unlink()
+    dst.mkdir(parents=True, exist_ok=True)
+
+    names = set()
+    for item in src.iterdir():
+        names.add(item.name)
+        target = dst / item.name
+        if item.is_dir():
+            _sync_tree(item, target)
+        elif _is_copy_stale(item, target):
+            # Replace rather than overwrite: copystat may have made it read-only
+            _remove_path(target)
+            _fast_copy(item, target)
+
+    for target in dst.iterdir():
+        if target.name not in names:
+            _remove_path(target)
+
+def _iter_mtimes(dir_path, skip_dirs=('_output',)):
+    """
+    Yields the mtime of every file below dir_path, pruning skip_dirs by name.
+    """
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in skip_dirs:
+                        yield from _iter_mtimes(entry.path, skip_dirs)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.stat(follow_symlinks=False).st_mtime
+            except FileNotFoundError:
+                pass # Removed while scanning, the next poll will see it
+
+def _skip_line_break(content, pos):
+    r"""
+    String-scan equivalent of the regex \s*\n at pos: returns the index
+    just past the last newline of the whitespace run starting there, or -1
+    if the run has no newline.
+    """
+    end = pos
+    length = len(content)
+    while end < length and content[end].isspace():
+        end += 1
+    newline = content.rfind('\n', pos, end)
+    return -1 if newline == -1 else newline + 1
+
+def _split_frontmatter(content):
+    r"""
+    Splits `---` delimited frontmatter off content with plain string scans
+    (same delimiter rules as ^---\s*\n(.*?)\n---\s*\n).
+    Returns (frontmatter_text, body), or None if there is no frontmatter.
+    """
+    fm_start = _skip_line_break(content, 3)
+    if fm_start == -1:
+        return None
+
+    while True:
+        pos = fm_start
+        while True:
+            end = content.find('\n---', pos)
+            if end == -1:
+                break
+            body_start = _skip_line_break(content, end + 4)
+            if body_start != -1:
+                return content[fm_start:end], content[body_start:]
+            pos = end + 1
+
+        # Like the regex, retry with the frontmatter starting after an earlier
+        # newline of the opening line's whitespace (only for blank lines)
+        fm_start = content.rfind('\n', 3, fm_start - 1) + 1
+        if fm_start == 0:
+            return None
+
+# Characters that make a YAML scalar something other than a plain string
+_YAML_INDICATORS = frozenset('-?:,[]{}#&*!|>\'"%@`')
+_YAML_STR_TAG = 'tag:yaml.org,2002:str'
+_UNSUPPORTED = object()
+
+def _resolve_plain(value):
+    """
+    Types a plain YAML scalar (int, bool, date, null, ...) exactly as
+    yaml.load would, using the shared resolver and constructor. Returns
+    _UNSUPPORTED for tags SafeConstructor can't build (e.g. `=`, `<<`), so
+    yaml.load gets to report them.
+    """
+    tag = YAML_RESOLVER.resolve(yaml.ScalarNode, value, (True, False))
+    if tag == _YAML_STR_TAG:
+        return value
+    construct = YAML_CONSTRUCTOR.yaml_constructors.get(tag)
+    if construct is None:
+        return _UNSUPPORTED
+    try:
+        return construct(YAML_CONSTRUCTOR, yaml.ScalarNode(tag, value))
+    except yaml.YAMLError:
+        return _UNSUPPORTED
+
+def _parse_scalar(value):
+    """
+    Parses a one-line scalar: plain, or quoted without escapes.
+    Returns _UNSUPPORTED for anything that needs the real YAML parser.
+    """
+    if not value:
+        return _resolve_plain('')
+    first = value[0]
+    if first in '"\'':
+        inner = value[1:-1]
+        if len(value) < 2 or value[-1] != first or first in inner or '\\' in inner:
+            return _UNSUPPORTED
+        return inner
+    if (first in _YAML_INDICATORS or ': ' in value or ' #' in value
+            or value.endswith(':')):
+        return _UNSUPPORTED
+    return _resolve_plain(value)
+
+def _parse_simple_frontmatter(fm_text):
+    """
+    Fast path for the usual frontmatter: top-level `key: scalar` lines and
+    `- item` lists under an empty key. Returns None as soon as it meets
+    anything else (nesting, comments, block scalars, flow collections, ...).
+    Requires PyYAML, whose resolver types the scalars.
+    """
+    metadata = {}
+    list_key = None
+    list_indent = None
+    for line in fm_text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if '\t' in line:
+            return None
+        indent = len(line) - len(line.lstrip(' '))
+
+        if stripped == '-' or stripped.startswith('- '):
+            if list_key is None:
+                return None
+            if list_indent is None:
+                list_indent = indent
+            elif indent != list_indent:
+                return None
+            item = _parse_scalar(stripped[2:].strip())
+            if item is _UNSUPPORTED:
+                return None
+            if not isinstance(metadata[list_key], list):
+                metadata[list_key] = []
+            metadata[list_key].append(item)
+            continue
+
+        key, sep, value = stripped.partition(':')
+        if indent or not sep or value[:1] not in ('', ' '):
+            return None
+        if not key.replace('-', '_').isidentifier():
+            return None
+        if not isinstance(_resolve_plain(key), str):
+            return None # e.g. `yes:` is a bool key in YAML
+
+        value = value.strip()
+        list_key = key if not value else None
+        list_indent = None
+        parsed = _parse_scalar(value)
+        if parsed is _UNSUPPORTED:
+            return None
+        metadata[key] = parsed
+    return metadata
+
+def _iter_html(dir_path):
+    """
+    Yields the path of every .html file below dir_path, in the same order as
+    os.walk: a directory's files first, then its subdirectories.
+    """
+    subdirs = []
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+            elif entry.name.endswith('.html'):
+                yield entry.path
+    for subdir in subdirs:
+        yield from _iter_html(subdir)
+
 # --- Core Logic ---
 
+class CompiledLayout:
+    """
+    A layout with its includes expanded, split around its variable tags.
+    `spans` holds (variable name, default, literal text that follows) for each
+    tag, so rendering a page is just a join - no regex, no re-reading.
+    """
+    def __init__(self, prefix, spans):
+        self.prefix = prefix
+        self.spans = spans
+
+    def render(self, variables):
+        parts = [self.prefix]
+        for var_name, default_val, literal in self.spans:
+            parts.append(str(variables.get(var_name, default_val)))
+            parts.append(literal)
+        return ''.join(parts)
+
 class SSG:
+    _yaml_loader = YAML_LOADER
+
     def __init__(self, directory):
         self.base_dir = Path(directory).resolve()
         self.content_dir = self.base_dir / 'content'
@@ -35,6 +347,28 @@ class SSG:
         self.layouts_dir = self.base_dir / 'layouts'
         self.assets_dir = self.base_dir / 'assets'
         self.extra_dir = self.base_dir / 'extra'
+
+        # Layout/include sources keyed by path, shared by every page of a build
+        self._file_cache = {}
+        # Include files with nested includes expanded, keyed by filename.
+        # Variables are left in place so the result is the same for every page.
+        self._processed_include_cache = {}
+        # Transitive includes of each file in _processed_include_cache
+        self._include_deps = {}
+        # CompiledLayout per layout filename
+        self._compiled_layouts = {}
+        # Layout mtimes looked up during the current build
+        self._layout_mtimes = {}
+        # Layout and include names used by the page being built
+        self._page_deps = set()
+        # (mtime, sha1) of the source text the current page was rendered from
+        self._page_source = None
+
+        # Output directories already created during the current build
+        self._dirs_created = set()
+
+        # Records what the last build produced, for incremental rebuilds
+        self.manifest_path = self.output_dir / '.manifest' / 'build_manifest.json'
         
         if not self.content_dir.exists():
             print(f"Error: Content directory not found at {self.content_dir}")
@@ -45,17 +379,24 @@ class SSG:
         Parses YAML frontmatter block.
         Returns (frontmatter_dict, content_body)
         """
-        match = re.match(r'^---\s*\n(.*?)\n---\s*\n(.*)$', content, re.DOTALL)
-        if match:
-            fm_text = match.group(1)
-            body = match.group(2)
+        # Most includes and partials have no frontmatter at all
+        if not content.startswith('---'):
+            return {}, content
+
+        split = _split_frontmatter(content)
+        if split:
+            fm_text, body = split
             
             metadata = {}
             if HAS_YAML:
-                try:
-                    metadata = yaml.safe_load(fm_text) or {}
-                except yaml.YAMLError as e:
-                    print(f"Warning: YAML parse error: {e}")
+                # Most frontmatter is flat enough to skip the YAML loader entirely
+                metadata = _parse_simple_frontmatter(fm_text)
+                if metadata is None:
+                    metadata = {}
+                    try:
+                        metadata = yaml.load(fm_text, Loader=self._yaml_loader) or {}
+                    except yaml.YAMLError as e:
+                        print(f"Warning: YAML parse error: {e}")
             else:
                 # Simple manual parser
                 for line in fm_text.splitlines():
@@ -66,80 +407,143 @@ class SSG:
             return metadata, body
         return {}, content
 
-    def process_includes(self, content):
+    def read_layout(self, filepath):
         """
-        Recursively replaces <template include="filename.html">
+        Returns the text of a layout or include file, or None if it does not
+        exist. Read once per build; missing files are cached too.
         """
-        pattern = r'<template\s+include=["\'](.*?)["\']\s*(?:/>|>(?:.*?</template>)?)'
-        
+        if filepath in self._file_cache:
+            return self._file_cache[filepath]
+        try:
+            text = filepath.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            text = None
+        self._file_cache[filepath] = text
+        return text
+
+    def expand_include(self, filename):
+        """
+        Returns the include file with its nested includes expanded (variables
+        untouched), or None if it does not exist. Memoized per build.
+        """
+        if filename in self._processed_include_cache:
+            return self._processed_include_cache[filename]
+
+        text = self.read_layout(self.layouts_dir / filename)
+        if text is None:
+            return None
+
+        deps = set()
+
         def replace_include(match):
-            filename = match.group(1)
-            filepath = self.layouts_dir / filename
-            if filepath.exists():
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    included_content = f.read()
-                    # Recursive processing
-                    return self.process_includes(included_content)
-            else:
-                print(f"Warning: Include file not found: {filename}")
-                return "" # or keep tag?
-        
-        return re.sub(pattern, replace_include, content, flags=re.DOTALL)
+            nested = match.group('inc')
+            if nested is None:
+                return match.group(0)
+            included_content = self.expand_include(nested)
+            # Only known once the nested include has been expanded
+            deps.add(nested)
+            deps.update(self._include_deps.get(nested, ()))
+            if included_content is None:
+                print(f"Warning: Include file not found: {nested}")
+                return ""
+            return included_content
 
-    def process_variables(self, content, variables):
+        expanded = _TEMPLATE_RE.sub(replace_include, text)
+        self._processed_include_cache[filename] = expanded
+        self._include_deps[filename] = deps
+        return expanded
+
+    def compile_layout(self, layout_name):
         """
-        Replaces <template variable="varname" default="val">
+        Returns the CompiledLayout for a layout, or None if it is missing.
+        Memoized per build, so pages sharing a layout skip the regex entirely.
         """
-        pattern = r'<template\s+variable=["\'](.*?)["\'](?:\s+default=["\'](.*?)["\'])?\s*(?:/>|>(?:.*?</template>)?)'
-        
-        def replace_variable(match):
-            var_name = match.group(1)
-            default_val = match.group(2) or ""
-            
+        if layout_name in self._compiled_layouts:
+            return self._compiled_layouts[layout_name]
+
+        text = self.expand_include(layout_name)
+        if text is None:
+            return None
+
+        literals = []
+        tags = []
+        pos = 0
+        for match in _TEMPLATE_RE.finditer(text):
+            if match.group('var') is None:
+                continue # Includes are already expanded
+            literals.append(text[pos:match.start()])
+            tags.append((match.group('var'), match.group('def') or ""))
+            pos = match.end()
+        literals.append(text[pos:])
+
+        prefix = literals[0]
+        spans = [tag + (literal,) for tag, literal in zip(tags, literals[1:])]
+        compiled = CompiledLayout(prefix, spans)
+        self._compiled_layouts[layout_name] = compiled
+        return compiled
+
+    def process_template(self, content, variables):
+        """
+        Replaces <template include="filename.html"> (recursively) and
+        <template variable="varname" default="val"> in a single pass.
+        """
+        def replace_directive(match):
+            filename = match.group('inc')
+            if filename is not None:
+                included_content = self.expand_include(filename)
+                self._page_deps.add(filename)
+                self._page_deps.update(self._include_deps.get(filename, ()))
+                if included_content is None:
+                    print(f"Warning: Include file not found: {filename}")
+                    return "" # or keep tag?
+                # Nested includes are already expanded, only variables remain
+                return self.process_template(included_content, variables)
+
+            var_name = match.group('var')
+            default_val = match.group('def') or ""
+
             # Handle nested variables if any (e.g. object.prop) - keeping it simple for now
             val = variables.get(var_name, default_val)
             return str(val)
-            
-        return re.sub(pattern, replace_variable, content, flags=re.DOTALL)
+
+        return _TEMPLATE_RE.sub(replace_directive, content)
 
     def build_page(self, file_path):
         """
         Reads a content file, processes it, and returns (output_rel_path, final_html, metadata).
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            raw_content = f.read()
+        # Stat before reading, so an edit made mid-build still looks newer
+        mtime = file_path.stat().st_mtime_ns
+        raw_content = file_path.read_text(encoding='utf-8')
+        self._page_source = (mtime, _hash_source(raw_content))
+        self._page_deps = set()
             
         metadata, body = self.parse_frontmatter(raw_content)
         
         # Handle Layout Inheritance
         if 'layout' in metadata:
             layout_name = metadata['layout']
-            layout_path = self.layouts_dir / layout_name
-            if layout_path.exists():
+            self._page_deps.add(layout_name)
+            # Compiled once per build; None if the layout does not exist
+            layout = self.compile_layout(layout_name)
+            if layout is not None:
                 # Process the inner content first
-                body = self.process_includes(body)
-                body = self.process_variables(body, metadata)
+                body = self.process_template(body, metadata)
                 
                 # Make content available as a variable
                 metadata['content'] = body
                 
-                # Load layout as the new body
-                with open(layout_path, 'r', encoding='utf-8') as f:
-                    body = f.read()
+                # Render the layout
+                self._page_deps.update(self._include_deps.get(layout_name, ()))
+                html = layout.render(metadata)
             else:
                 print(f"Warning: Layout {layout_name} not found for {file_path}")
+                html = self.process_template(body, metadata)
+        else:
+            # Includes are expanded in the same pass as variables, so an included
+            # header with <template variable="title"> still sees the page metadata.
+            html = self.process_template(body, metadata)
 
-        # 1. Process Includes (Doing this first allows templates to have variables? 
-        # Or should we Substitute variables first?
-        # User plan: "Parse Content -> Extract Frontmatter -> Apply Templates -> Generate HTML -> Write"
-        # "Template Engine -> Include directive... Replace with file content"
-        # "Variable directive... Replace with frontmatter values"
-        
-        # If I include a header that has <template variable="title">, I need to process includes first, then variables.
-        pass1 = self.process_includes(body)
-        pass2 = self.process_variables(pass1, metadata)
-        
-        
         # Determine output path
         rel_path = file_path.relative_to(self.content_dir)
         
@@ -151,89 +555,286 @@ class SSG:
             # content/blog/post1.html -> _output/blog/post1/index.html
             output_rel_path = rel_path.with_suffix('') / 'index.html'
             
-        return output_rel_path, pass2, metadata
+        return output_rel_path, html, metadata
+
+    def try_build_page(self, file_path):
+        """
+        Wraps build_page, returning (result, deps, source, error) so failures
+        survive a process pool. deps lists the layouts and includes the page
+        used; source is the (mtime, sha1) of the text it was rendered from.
+        """
+        try:
+            result = self.build_page(file_path)
+            return result, sorted(self._page_deps), self._page_source, None
+        except Exception as e:
+            return None, [], None, str(e)
+
+    def build_pages(self, src_paths, parallel=True):
+        """
+        Yields (src_path, result, deps, source, error) for each content file, in order.
+        Large sites are rendered across a process pool unless parallel is False.
+        """
+        workers = os.cpu_count() or 1
+        if not parallel or workers < 2 or len(src_paths) < PARALLEL_MIN_PAGES:
+            for src_path in src_paths:
+                yield (src_path,) + self.try_build_page(src_path)
+            return
+
+        # watch/serve keep other threads running; forking those can deadlock
+        # a worker (e.g. on a held stdout lock), so start workers from a
+        # clean forkserver process where the platform has one.
+        mp_context = None
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context('forkserver')
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                 initializer=_init_worker,
+                                 initargs=(str(self.base_dir),)) as executor:
+            results = executor.map(_build_page_worker, src_paths, chunksize=8)
+            for src_path, (result, deps, source, error) in zip(src_paths, results):
+                yield src_path, result, deps, source, error
+
+    def layout_mtime(self, name):
+        """
+        Returns the mtime of a layout/include file, or None if it is missing.
+        """
+        if name not in self._layout_mtimes:
+            try:
+                mtime = (self.layouts_dir / name).stat().st_mtime_ns
+            except OSError:
+                mtime = None
+            self._layout_mtimes[name] = mtime
+        return self._layout_mtimes[name]
+
+    def load_manifest(self):
+        """
+        Returns the manifest of the previous build, or None if there is no
+        usable one (in which case the next build starts from scratch).
+        """
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+            return None
+        return manifest
+
+    def is_page_stale(self, src_path, entry):
+        """
+        Checks a content file against its manifest entry. The source is
+        re-hashed only when its mtime moved, so touched files are not rebuilt.
+        """
+        if not (self.output_dir / entry['output']).exists():
+            return True
+        for name, mtime in entry['deps'].items():
+            if self.layout_mtime(name) != mtime:
+                return True
+
+        mtime = src_path.stat().st_mtime_ns
+        if mtime == entry['mtime']:
+            return False
+        if _hash_source(src_path.read_text(encoding='utf-8')) != entry['sha1']:
+            return True
+        entry['mtime'] = mtime
+        return False
+
+    def pages_affected_by(self, changed, pages):
+        """
+        Maps changed paths to the content files (relative, posix) to rebuild:
+        the content files themselves plus pages using a changed layout/include.
+        """
+        affected = set()
+        for path in changed:
+            path = Path(path).resolve()
+            for root, is_layout in ((self.content_dir, False), (self.layouts_dir, True)):
+                try:
+                    rel = path.relative_to(root).as_posix()
+                except ValueError:
+                    continue
+                if not is_layout:
+                    affected.add(rel)
+                else:
+                    affected.update(src for src, entry in pages.items()
+                                    if rel in entry['deps'])
+        return affected
+
+    def write_output(self, path, text):
+        """
+        Writes a generated file using a write buffer sized for whole pages.
+        """
+        with open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(text)
 
     def generate_sitemap(self, pages):
         """
-        Generates sitemap.xml
+        Generates sitemap.xml, streaming one <url> block per page to the file.
         """
-        sitemap = ['<?xml version="1.0" encoding="UTF-8"?>']
-        sitemap.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
-        
-        for path, meta in pages:
-            # Assuming base url is / for now or we could add a config
-            url_path = str(path).replace('index.html', '').replace('\\', '/')
-            if not url_path.startswith('/'):
-                url_path = '/' + url_path
-                
-            priority = "0.8"
-            if url_path == '/': priority = "1.0"
-            
-            # Date
-            lastmod = meta.get('date', datetime.now().strftime('%Y-%m-%d'))
+        today = datetime.now().strftime('%Y-%m-%d')
+        sitemap_path = self.output_dir / 'sitemap.xml'
+        with open(sitemap_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
             
-            sitemap.append('  <url>')
-            sitemap.append(f'    <loc>{url_path}</loc>')
-            sitemap.append(f'    <lastmod>{lastmod}</lastmod>')
-            sitemap.append(f'    <priority>{priority}</priority>')
-            sitemap.append('  </url>')
-            
-        sitemap.append('</urlset>')
-        
-        with open(self.output_dir / 'sitemap.xml', 'w', encoding='utf-8') as f:
-            f.write('\n'.join(sitemap))
+            for path, meta in pages:
+                # Assuming base url is / for now or we could add a config
+                url_path = str(path).replace('index.html', '').replace('\\', '/')
+                if not url_path.startswith('/'):
+                    url_path = '/' + url_path
+                    
+                priority = "0.8"
+                if url_path == '/': priority = "1.0"
+                
+                # Date
+                lastmod = meta.get('date', today)
+                
+                f.write(f'  <url>\n    <loc>{escape(url_path)}</loc>\n'
+                        f'    <lastmod>{escape(str(lastmod))}</lastmod>\n'
+                        f'    <priority>{priority}</priority>\n  </url>\n')
+                
+            f.write('</urlset>')
 
-    def build(self):
+    def build(self, changed=None):
+        """
+        Builds the site. Pages whose source, layout and includes are unchanged
+        since the last build are kept as they are. When `changed` is given
+        (watch mode), only those paths and the pages depending on them are
+        looked at.
+        """
         print(f"Building site from {self.base_dir}...")
         start_time = time.time()
-        
-        # Clean output
-        if self.output_dir.exists():
-            shutil.rmtree(self.output_dir)
-        self.output_dir.mkdir()
 
-        # Track pages for sitemap
-        built_pages = []
+        # Drop cached layouts so edits picked up by watch mode take effect
+        self._file_cache.clear()
+        self._processed_include_cache.clear()
+        self._include_deps.clear()
+        self._compiled_layouts.clear()
+        self._layout_mtimes.clear()
+        self._dirs_created.clear()
+
+        manifest = self.load_manifest()
+        if manifest is None:
+            # Clean output
+            changed = None
+            if self.output_dir.exists():
+                shutil.rmtree(self.output_dir)
+            self.output_dir.mkdir()
+            manifest = {'version': MANIFEST_VERSION, 'pages': {}, 'extra': []}
+        old_pages = manifest['pages']
 
         # Process Content
-        for root, dirs, files in os.walk(self.content_dir):
-            for file in files:
-                if file.endswith('.html'):
-                    src_path = Path(root) / file
+        src_paths = [Path(src_path_str) for src_path_str in _iter_html(self.content_dir)]
+        rel_names = {src_path: src_path.relative_to(self.content_dir).as_posix()
+                     for src_path in src_paths}
+
+        if changed is not None:
+            affected = self.pages_affected_by(changed, old_pages)
+            stale = [p for p in src_paths
+                     if rel_names[p] in affected or rel_names[p] not in old_pages]
+        else:
+            stale = [p for p in src_paths
+                     if rel_names[p] not in old_pages
+                     or self.is_page_stale(p, old_pages[rel_names[p]])]
+
+        new_pages = {}
+        # Per-page lines are written in one batch once all pages are done
+        log = []
+        # Watch mode rebuilds run on the handler's timer thread and touch only
+        # a few pages, so they never start a pool
+        parallel = changed is None
+        for src_path, result, deps, source, error in self.build_pages(stale, parallel):
+            rel_name = rel_names[src_path]
+            if error is not None:
+                log.append(f"  Error processing {src_path}: {error}\n")
+                continue
+            try:
+                out_rel_path, html, meta = result
+                
+                out_path = self.output_dir / out_rel_path
+                parent = out_path.parent
+                if parent not in self._dirs_created:
+                    parent.mkdir(parents=True, exist_ok=True)
+                    self._dirs_created.add(parent)
+                
+                self.write_output(out_path, html)
+
+                sitemap_meta = {}
+                if 'date' in meta:
+                    sitemap_meta['date'] = str(meta['date'])
+                mtime, sha1 = source
+                new_pages[rel_name] = {
+                    'mtime': mtime,
+                    'sha1': sha1,
+                    'output': out_rel_path.as_posix(),
+                    'deps': {name: self.layout_mtime(name) for name in deps},
+                    'sitemap': sitemap_meta,
+                }
+                log.append(f"  Generated: {out_rel_path}\n")
+            except Exception as e:
+                log.append(f"  Error processing {src_path}: {e}\n")
+
+        sys.stdout.writelines(log)
+        sys.stdout.flush()
+
+        # Keep unchanged pages, in source order so the sitemap is stable
+        stale = set(stale)
+        pages = {}
+        built_pages = []
+        for src_path in src_paths:
+            rel_name = rel_names[src_path]
+            entry = new_pages.get(rel_name)
+            if entry is None and src_path not in stale:
+                entry = old_pages.get(rel_name)
+            if entry is None:
+                continue
+            pages[rel_name] = entry
+            # Store for sitemap (using the output path)
+            built_pages.append((Path(entry['output']), entry['sitemap']))
+
+        # Remove output of pages that were deleted or failed to build
+        kept_outputs = {entry['output'] for entry in pages.values()}
+        for rel_name, entry in old_pages.items():
+            if rel_name not in pages and entry['output'] not in kept_outputs:
+                out_path = self.output_dir / entry['output']
+                if out_path.exists():
+                    out_path.unlink()
+                    print(f"  Removed: {entry['output']}")
+                if out_path.parent != self.output_dir:
                     try:
-                        out_rel_path, html, meta = self.build_page(src_path)
-                        
-                        out_path = self.output_dir / out_rel_path
-                        out_path.parent.mkdir(parents=True, exist_ok=True)
-                        
-                        with open(out_path, 'w', encoding='utf-8') as f:
-                            f.write(html)
-                            
-                        # Store for sitemap (using out_rel_path)
-                        built_pages.append((out_rel_path, meta))
-                        print(f"  Generated: {out_rel_path}")
-                    except Exception as e:
-                        print(f"  Error processing {src_path}: {e}")
+                        out_path.parent.rmdir()
+                    except OSError:
+                        pass # Still holds other pages
 
         # Copy Assets
         if self.assets_dir.exists():
-            shutil.copytree(self.assets_dir, self.output_dir / 'assets')
+            _sync_tree(self.assets_dir, self.output_dir / 'assets')
             print("  Copied assets")
+        else:
+            _remove_path(self.output_dir / 'assets')
 
         # Copy Extra
+        extra = []
         if self.extra_dir.exists():
             for item in self.extra_dir.iterdir():
+                extra.append(item.name)
                 dest = self.output_dir / item.name
                 if item.is_dir():
-                    shutil.copytree(item, dest)
-                else:
-                    shutil.copy2(item, dest)
+                    _sync_tree(item, dest)
+                elif _is_copy_stale(item, dest):
+                    _remove_path(dest)
+                    _fast_copy(item, dest)
             print("  Copied extra files")
+        for name in manifest['extra']:
+            if name not in extra:
+                _remove_path(self.output_dir / name)
 
         # Generate Sitemap
         self.generate_sitemap(built_pages)
         print("  Generated sitemap.xml")
 
+        self.manifest_path.parent.mkdir(exist_ok=True)
+        self.write_output(self.manifest_path, json.dumps(
+            {'version': MANIFEST_VERSION, 'pages': pages, 'extra': extra}, indent=1))
+
         print(f"Build complete in {time.time() - start_time:.2f}s")
 
     def serve(self, port=3000):
@@ -279,14 +880,7 @@ class SSG:
             try:
                 while True:
                     # check max mtime of all files
-                    current_max = 0
-                    for root, _, files in os.walk(self.base_dir):
-                        if '_output' in root: continue
-                        for f in files:
-                            p = Path(root) / f
-                            mtime = p.stat().st_mtime
-                            if mtime > current_max:
-                                current_max = mtime
+                    current_max = max(_iter_mtimes(self.base_dir), default=0)
                     
                     if last_mtime == 0:
                         last_mtime = current_max
@@ -300,24 +894,65 @@ class SSG:
             except KeyboardInterrupt:
                 print("Stopping watch...")
 
+# --- Parallel Build Workers ---
+
+_worker_ssg = None
+
+def _init_worker(base_dir):
+    # One SSG per worker process so layout and include caches are shared
+    # across all the pages that worker renders.
+    global _worker_ssg
+    _worker_ssg = SSG(base_dir)
+
+def _build_page_worker(src_path):
+    return _worker_ssg.try_build_page(src_path)
+
 if HAS_WATCHDOG:
     class SSGEventHandler(FileSystemEventHandler):
-        def __init__(self, ssg_instance):
+        # Only edits under these site directories trigger a rebuild
+        WATCHED_DIRS = ('content', 'layouts', 'assets', 'extra')
+        # Newer watchdog versions also report reads (opened, closed_no_write);
+        # the build reads sources itself, so those would retrigger it forever.
+        WATCHED_EVENTS = ('created', 'modified', 'deleted', 'moved')
+
+        def __init__(self, ssg_instance, delay=0.3):
             self.ssg = ssg_instance
-            self.last_build = 0
+            self.delay = delay
+            self.watched_prefixes = tuple(
+                str(ssg_instance.base_dir / name) + os.sep for name in self.WATCHED_DIRS)
+            # Paths seen since the last build; a burst of events (save, swap,
+            # rename) keeps resetting the timer and ends up in one rebuild.
+            self.changed_paths = set()
+            self.timer = None
+            self.lock = threading.Lock()
+            self.build_lock = threading.Lock()
             
         def on_any_event(self, event):
             if event.is_directory: return
-            if '_output' in event.src_path: return
-            
-            # Debounce
-            now = time.time()
-            if now - self.last_build < 1:
-                return
-            
-            print(f"\nChanged: {event.src_path}")
-            self.ssg.build()
-            self.last_build = now
+            if event.event_type not in self.WATCHED_EVENTS: return
+
+            paths = [path for path in (event.src_path, getattr(event, 'dest_path', None))
+                     if path and path.startswith(self.watched_prefixes)]
+            if not paths: return
+
+            with self.lock:
+                self.changed_paths.update(paths)
+                if self.timer is not None:
+                    self.timer.cancel()
+                self.timer = threading.Timer(self.delay, self._flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+        def _flush(self):
+            with self.lock:
+                changed, self.changed_paths = self.changed_paths, set()
+                self.timer = None
+            if not changed: return
+
+            # Never run two builds at once if a new burst lands mid-build
+            with self.build_lock:
+                print(f"\nChanged: {', '.join(sorted(changed))}")
+                self.ssg.build(changed=changed)
 
 # --- CLI ---
 
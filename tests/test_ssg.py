@@ -0,0 +1,153 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ssg
+
+
+class SiteTestCase(unittest.TestCase):
+    """
+    Builds throwaway sites in a temporary directory.
+    """
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.site = Path(self._tmp.name)
+        (self.site / 'content').mkdir()
+        (self.site / 'layouts').mkdir()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, rel_path, text):
+        path = self.site / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            # Make sure the edit is visible to mtime checks
+            mtime = path.stat().st_mtime_ns + 1_000_000_000
+            path.write_text(text, encoding='utf-8')
+            os.utime(path, ns=(mtime, mtime))
+        else:
+            path.write_text(text, encoding='utf-8')
+        return path
+
+    def build(self, generator=None, **kwargs):
+        generator = generator or ssg.SSG(self.site)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.build(**kwargs)
+        return generator
+
+    def output(self, rel_path='index.html'):
+        return (self.site / '_output' / rel_path).read_text(encoding='utf-8')
+
+
+class IncrementalBuildTest(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write('layouts/base.html',
+                   '<template include="header.html"></template>'
+                   '<template variable="content"></template>')
+        self.write('layouts/header.html',
+                   '<header><template include="meta.html"></template></header>')
+        self.write('layouts/meta.html', 'META-V1')
+        self.write('content/index.html', '---\nlayout: base.html\n---\n<p>body</p>\n')
+
+    def test_nested_include_change_rebuilds_page(self):
+        self.build()
+        self.assertIn('META-V1', self.output())
+
+        self.write('layouts/meta.html', 'META-V2')
+        self.build()
+        self.assertIn('META-V2', self.output())
+
+    def test_nested_include_change_rebuilds_page_in_watch_mode(self):
+        generator = self.build()
+
+        meta = self.write('layouts/meta.html', 'META-V2')
+        self.build(generator, changed={str(meta)})
+        self.assertIn('META-V2', self.output())
+
+    def test_unchanged_page_is_not_rewritten(self):
+        self.build()
+        out_path = self.site / '_output' / 'index.html'
+        out_path.write_text('KEPT', encoding='utf-8')
+
+        self.build()
+        self.assertEqual(self.output(), 'KEPT')
+
+    def test_edit_during_render_is_picked_up_next_build(self):
+        generator = ssg.SSG(self.site)
+        build_page = generator.build_page
+
+        def build_then_edit(file_path):
+            result = build_page(file_path)
+            self.write('content/index.html', '---\nlayout: base.html\n---\n<p>edited</p>\n')
+            return result
+
+        generator.build_page = build_then_edit
+        self.build(generator)
+        generator.build_page = build_page
+
+        self.build(generator)
+        self.assertIn('<p>edited</p>', self.output())
+
+
+class AssetSyncTest(SiteTestCase):
+    def test_read_only_asset_is_updated(self):
+        asset = self.write('assets/a.css', 'v1')
+        asset.chmod(0o444)
+        self.build()
+
+        asset.chmod(0o644)
+        self.write('assets/a.css', 'v2')
+        asset.chmod(0o444)
+        self.build()
+        self.assertEqual(self.output('assets/a.css'), 'v2')
+
+    def test_removed_assets_dir_is_pruned(self):
+        self.write('assets/a.css', 'v1')
+        self.build()
+
+        shutil.rmtree(self.site / 'assets')
+        self.build()
+        self.assertFalse((self.site / '_output' / 'assets').exists())
+
+
+class TemplateTest(SiteTestCase):
+    def test_bare_variable_tag_does_not_swallow_following_include(self):
+        self.write('layouts/nav.html', '<nav>NAV</nav>')
+        self.write('content/index.html',
+                   '---\ntitle: T\n---\n'
+                   '<h1><template variable="title"></h1>\n'
+                   '<template include="nav.html"></template>\n'
+                   '<p>end</p>\n')
+        self.build()
+        self.assertEqual(self.output(), '<h1>T</h1>\n<nav>NAV</nav>\n<p>end</p>\n')
+
+    def test_bare_variable_tag_in_layout(self):
+        self.write('layouts/nav.html', '<nav>NAV</nav>')
+        self.write('layouts/base.html',
+                   '<h1><template variable="title"></h1>'
+                   '<template include="nav.html"></template>'
+                   '<template variable="content"></template>')
+        self.write('content/index.html', '---\ntitle: T\nlayout: base.html\n---\n<p>end</p>\n')
+        self.build()
+        self.assertEqual(self.output(), '<h1>T</h1><nav>NAV</nav><p>end</p>\n')
+
+
+class FrontmatterTest(SiteTestCase):
+    @unittest.skipUnless(ssg.HAS_YAML, "PyYAML not installed")
+    def test_unconstructible_scalar_falls_back_to_yaml(self):
+        self.write('content/index.html', '---\ntitle: =\n---\n<p>body</p>\n')
+        self.build()
+        self.assertEqual(self.output(), '<p>body</p>\n')
+
+
+if __name__ == '__main__':
+    unittest.main()